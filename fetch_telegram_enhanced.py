@@ -1,20 +1,40 @@
 #!/usr/bin/env python3
 """
-Telegram Channel Fetcher - ImageKit CDN Version
+Telegram Channel Fetcher
 Fetches posts from multiple Telegram channels and saves to JSON
 FILTERS: Replies, Forwards, Duplicates, Old Posts, Short Text
-Images uploaded to ImageKit CDN (20GB free storage + bandwidth)
+Media storage is pluggable via TELEGRAM_STORE=local|imagekit:
+  imagekit (default) - ImageKit CDN (20GB free storage + bandwidth)
+  local              - plain files under telegram_media/
 """
 
 import json
 import os
-from datetime import datetime, timedelta
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 from telethon import TelegramClient
-from telethon.tl.types import MessageMediaPhoto, MessageMediaDocument
+from telethon.errors import ChannelInvalidError, FloodWaitError, RPCError
+from telethon.tl.types import InputPeerChannel, MessageMediaPhoto, MessageMediaDocument
 import asyncio
-import requests
+import aiohttp
 import base64
 
+try:
+    import ijson  # Streaming JSON parser - archive never has to fit in memory
+except ImportError:
+    ijson = None
+
+try:
+    from pybloom_live import ScalableBloomFilter  # Bloom-filter dedup - MBs, not 100s of MB
+except ImportError:
+    ScalableBloomFilter = None
+
+try:
+    import orjson  # Rust-native JSON - ~5-10x faster encode than stdlib json
+except ImportError:
+    orjson = None
+
 # Telegram API credentials
 API_ID = os.getenv('TELEGRAM_API_ID')
 API_HASH = os.getenv('TELEGRAM_API_HASH')
@@ -32,17 +52,31 @@ TRADING_CHANNELS = [ch.strip() for ch in TRADING_CHANNELS_ENV.split(',') if ch.s
 AIRDROP_CHANNELS = [ch.strip() for ch in AIRDROP_CHANNELS_ENV.split(',') if ch.strip()]
 
 # Configuration
+STORE_BACKEND = os.getenv('TELEGRAM_STORE', 'imagekit').lower()  # local | imagekit
 POSTS_PER_CHANNEL = 20  # Fetch 20 per channel (5 channels = 100 posts per category)
+MAX_CONCURRENT_CHANNELS = 5  # Channels fetched in parallel (FLOOD_WAIT is per-channel)
 MAX_DAYS_OLD = 7
 MIN_TEXT_LENGTH = 10
 FILTER_FORWARDS = True
+DEDUP_BLOOM_FILE = 'dedup.bloom'  # Persisted bloom filter of seen post IDs
+PHOTO_EXT = '.jpg'  # Telegram photos are always JPEG
+MIME_EXT_MAP = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+    'video/mp4': '.mp4',
+    'video/quicktime': '.mov',
+}
+ENTITY_CACHE_FILE = '.entity_cache.json'  # Resolved channel id/access_hash pairs
+LAST_SEEN_FILE = '.last_seen.json'  # Per-channel newest message id from the last run
 
 # Check credentials
 if not API_ID or not API_HASH:
     print("❌ Missing Telegram API credentials!")
     exit(1)
 
-if not IMAGEKIT_PRIVATE_KEY or not IMAGEKIT_URL_ENDPOINT:
+if STORE_BACKEND == 'imagekit' and (not IMAGEKIT_PRIVATE_KEY or not IMAGEKIT_URL_ENDPOINT):
     print("❌ Missing ImageKit credentials!")
     exit(1)
 
@@ -50,86 +84,342 @@ if not TRADING_CHANNELS and not AIRDROP_CHANNELS:
     print("❌ No channels specified!")
     exit(1)
 
-def upload_to_imagekit(filepath, filename):
-    """Upload image to ImageKit and return permanent URL"""
+# Shared HTTP session for all ImageKit calls (created in main, closed in finally)
+http_session = None
+
+def load_entity_cache():
+    """Load cached channel id/access_hash pairs from disk.
+
+    StringSession keeps its entity cache in memory only, so every run would
+    otherwise pay one ResolveUsernameRequest per channel just to rebuild it.
+    """
+    if not os.path.exists(ENTITY_CACHE_FILE):
+        return {}
     try:
-        with open(filepath, 'rb') as f:
-            files = {'file': (filename, f)}
-            data = {
-                'fileName': filename,
-                'folder': '/telegram'  # Organize in folder
-            }
-            
-            response = requests.post(
-                'https://upload.imagekit.io/api/v1/files/upload',
-                files=files,
-                data=data,
-                auth=(IMAGEKIT_PRIVATE_KEY, ''),  # Private key as username, no password
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                url = data['url']
-                file_id = data['fileId']
+        with open(ENTITY_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️  Could not load {ENTITY_CACHE_FILE}: {e}")
+        return {}
+
+def save_entity_cache(cache):
+    """Persist resolved channel peers for the next run"""
+    try:
+        with open(ENTITY_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+    except Exception as e:
+        print(f"⚠️  Could not save {ENTITY_CACHE_FILE}: {e}")
+
+def update_entity_cache(channel_name, channel):
+    """Refresh one channel's cache entry (used when a cached peer goes stale)"""
+    cache = load_entity_cache()
+    cache[channel_name] = {'id': channel.id, 'access_hash': channel.access_hash}
+    save_entity_cache(cache)
+
+def load_last_seen():
+    """Load each channel's newest message id from the previous run.
+
+    Passed to get_messages as min_id, so Telegram only returns genuinely
+    new messages - in steady state that's 0-3 per channel instead of the
+    full 3x window.
+    """
+    if not os.path.exists(LAST_SEEN_FILE):
+        return {}
+    try:
+        with open(LAST_SEEN_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️  Could not load {LAST_SEEN_FILE}: {e}")
+        return {}
+
+def save_last_seen(last_seen):
+    """Persist per-channel high-water marks for the next run"""
+    try:
+        with open(LAST_SEEN_FILE, 'w', encoding='utf-8') as f:
+            json.dump(last_seen, f)
+    except Exception as e:
+        print(f"⚠️  Could not save {LAST_SEEN_FILE}: {e}")
+
+class DedupIndex:
+    """Membership index of already-seen posts, keyed per channel.
+
+    Message ids are unique within a channel, so the in-memory backend keeps
+    one set[int] per channel: integer hashing is essentially free and no
+    "<channel>_<id>" string has to be built (and hashed character by
+    character) for every message scanned. The bloom-filter backend keeps
+    composite keys, since a bloom filter hashes the key bytes either way.
+    The archive on disk keeps the composite-string id form unchanged.
+    """
+
+    def __init__(self, bloom=None):
+        self._bloom = bloom
+        self._by_channel = defaultdict(set)
+
+    def seen(self, channel_name, msg_id):
+        if self._bloom is not None:
+            return f"{channel_name}_{msg_id}" in self._bloom
+        return msg_id in self._by_channel[channel_name]
+
+    def add(self, channel_name, msg_id):
+        if self._bloom is not None:
+            self._bloom.add(f"{channel_name}_{msg_id}")
+        else:
+            self._by_channel[channel_name].add(msg_id)
+
+    def add_post_id(self, post_id):
+        """Ingest a composite '<channel>_<id>' key as stored in the archive"""
+        if self._bloom is not None:
+            self._bloom.add(post_id)
+            return
+        channel, _, mid = post_id.rpartition('_')
+        if mid.isdigit():
+            self._by_channel[channel].add(int(mid))
+
+    def __len__(self):
+        if self._bloom is not None:
+            return len(self._bloom)
+        return sum(len(ids) for ids in self._by_channel.values())
+
+def load_dedup_index():
+    """Build the dedup membership store for post IDs.
+
+    Uses a ScalableBloomFilter when pybloom_live is installed: the seen-id
+    log grows forever, and at FPR 1e-4 a million ids cost a few MB instead
+    of ~100 MB of Python sets. A false positive just skips one real post,
+    which is acceptable at this volume. Falls back to per-channel int sets
+    otherwise.
+    """
+    if ScalableBloomFilter is None:
+        return DedupIndex()
+    if os.path.exists(DEDUP_BLOOM_FILE):
+        try:
+            with open(DEDUP_BLOOM_FILE, 'rb') as f:
+                bloom = ScalableBloomFilter.fromfile(f)
+            print(f"📋 Loaded bloom filter with {len(bloom)} seen post IDs")
+            return DedupIndex(bloom)
+        except Exception as e:
+            print(f"⚠️  Could not load {DEDUP_BLOOM_FILE}, starting fresh: {e}")
+    return DedupIndex(ScalableBloomFilter(initial_capacity=100000, error_rate=1e-4))
+
+def save_dedup_index(existing_ids):
+    """Persist the bloom filter across runs (no-op for the in-memory fallback)"""
+    if existing_ids._bloom is None:
+        return
+    try:
+        with open(DEDUP_BLOOM_FILE, 'wb') as f:
+            existing_ids._bloom.tofile(f)
+    except Exception as e:
+        print(f"⚠️  Could not save {DEDUP_BLOOM_FILE}: {e}")
+
+def write_posts_json(path, posts, meta):
+    """Stream the archive to disk one post at a time.
+
+    json.dump/orjson.dumps on the whole output dict buffer the full encoded
+    document before any byte hits disk, roughly doubling peak memory during
+    the write. Framing the results array by hand keeps only one encoded
+    post in memory at a time.
+    """
+    if orjson is not None:
+        dumps = lambda obj: orjson.dumps(obj).decode()
+    else:
+        dumps = lambda obj: json.dumps(obj, ensure_ascii=False)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"results": [\n')
+        for i, post in enumerate(posts):
+            if i:
+                f.write(',\n')
+            f.write(dumps(post))
+        f.write('\n],\n')
+        # Splice the metadata keys in by trimming the object's outer braces
+        f.write(dumps(meta)[1:-1])
+        f.write('}\n')
+
+async def _retry(coro_factory, retries=3, base=0.5):
+    """Retry a network call with exponential backoff + jitter.
+
+    Transient timeouts and RPC/HTTP errors get backoff; Telegram's
+    FloodWaitError is honored for exactly the seconds it asks for.
+    ChannelInvalidError is never retried - it means a cached peer is
+    stale, and the caller's re-resolve fallback should run immediately.
+    Re-raises after the last attempt.
+    """
+    for attempt in range(retries):
+        try:
+            return await coro_factory()
+        except FloodWaitError as e:
+            if attempt == retries - 1:
+                raise
+            print(f"    ⏳ Flood wait: sleeping {e.seconds}s")
+            await asyncio.sleep(e.seconds)
+        except ChannelInvalidError:
+            raise
+        except (asyncio.TimeoutError, aiohttp.ClientError, RPCError) as e:
+            if attempt == retries - 1:
+                raise
+            delay = base * 2 ** attempt + random.random() * 0.25
+            print(f"    🔁 Retrying after error ({attempt + 1}/{retries - 1}): {e}")
+            await asyncio.sleep(delay)
+
+async def upload_to_imagekit(data, filename):
+    """Upload image bytes to ImageKit and return permanent URL"""
+    async def _post():
+        # Rebuild the form each attempt - FormData is single-use
+        form = aiohttp.FormData()
+        form.add_field('file', data, filename=filename)
+        form.add_field('fileName', filename)
+        form.add_field('folder', '/telegram')  # Organize in folder
+
+        async with http_session.post(
+            'https://upload.imagekit.io/api/v1/files/upload',
+            data=form,
+            auth=aiohttp.BasicAuth(IMAGEKIT_PRIVATE_KEY, ''),  # Private key as username, no password
+            timeout=aiohttp.ClientTimeout(total=30)
+        ) as response:
+            if response.status == 200:
+                payload = await response.json()
+                url = payload['url']
+                file_id = payload['fileId']
                 print(f"    ✅ Uploaded to ImageKit: {url}")
                 return {'url': url, 'fileId': file_id}
             else:
-                print(f"    ❌ ImageKit upload failed: {response.status_code} - {response.text}")
+                text = await response.text()
+                print(f"    ❌ ImageKit upload failed: {response.status} - {text}")
                 return None
+
+    try:
+        return await _retry(_post)
     except Exception as e:
         print(f"    ❌ Error uploading to ImageKit: {e}")
         return None
 
-async def download_media(client, message, channel_name):
-    """Download media from message, upload to ImageKit, and return URL"""
+async def list_imagekit_files():
+    """List all files currently in the ImageKit /telegram folder"""
+    try:
+        async with http_session.get(
+            'https://api.imagekit.io/v1/files',
+            params={'path': '/telegram', 'limit': '1000'},
+            auth=aiohttp.BasicAuth(IMAGEKIT_PRIVATE_KEY, ''),
+            timeout=aiohttp.ClientTimeout(total=30)
+        ) as response:
+            if response.status != 200:
+                print(f"⚠️  Could not list ImageKit files: {response.status}")
+                return []
+            return await response.json()
+    except Exception as e:
+        print(f"⚠️  Could not list ImageKit files: {e}")
+        return []
+
+class MediaStore:
+    """Storage backend for downloaded media.
+
+    The fetch pipeline is backend-agnostic: it asks existing() for the
+    files a previous run already stored, hands put() the media bytes, and
+    calls cleanup() at the end of the run.
+    """
+
+    async def existing(self):
+        """Map of already-stored filename -> {'url': ..., 'fileId': ...}"""
+        return {}
+
+    async def put(self, data, filename):
+        raise NotImplementedError
+
+    async def cleanup(self, current_posts):
+        pass
+
+class LocalStore(MediaStore):
+    """Save media as plain files under telegram_media/ (no CDN)"""
+
+    def __init__(self, directory='telegram_media'):
+        self.directory = directory
+
+    async def existing(self):
+        if not os.path.isdir(self.directory):
+            return {}
+        return {name: {'url': f"/{self.directory}/{name}", 'fileId': None}
+                for name in os.listdir(self.directory)}
+
+    async def put(self, data, filename):
+        os.makedirs(self.directory, exist_ok=True)
+        filepath = os.path.join(self.directory, filename)
+        # Keep the blocking write off the event loop
+        await asyncio.to_thread(self._write, filepath, data)
+        return {'url': f"/{self.directory}/{filename}", 'fileId': None}
+
+    @staticmethod
+    def _write(filepath, data):
+        with open(filepath, 'wb') as f:
+            f.write(data)
+
+class ImageKitStore(MediaStore):
+    """Upload media to ImageKit CDN (20GB free storage + bandwidth)"""
+
+    def __init__(self):
+        self._files = []
+
+    async def existing(self):
+        # One list call serves both the re-upload skip and the final cleanup
+        self._files = await list_imagekit_files()
+        return {f['name']: f for f in self._files}
+
+    async def put(self, data, filename):
+        return await upload_to_imagekit(data, filename)
+
+    async def cleanup(self, current_posts):
+        await cleanup_old_images(current_posts, self._files)
+
+async def download_media(client, message, channel_name, store, existing_media):
+    """Download media from message, push it to the media store, and return URL"""
     if not message.media:
         return None
     
     try:
-        # Create temp directory
-        temp_dir = 'temp_telegram'
-        os.makedirs(temp_dir, exist_ok=True)
-        
         timestamp = int(message.date.timestamp())
         filename = f"{channel_name}_{message.id}_{timestamp}"
         
+        # Classify once here so callers get a 'kind' instead of re-deriving
+        # the media type from the filename/URL per post
         if isinstance(message.media, MessageMediaPhoto):
-            filename += '.jpg'
+            filename += PHOTO_EXT
+            kind = 'image'
         elif isinstance(message.media, MessageMediaDocument):
             mime = message.media.document.mime_type
-            if 'image' in mime:
-                ext = mime.split('/')[-1]
-                filename += f'.{ext}'
-            elif 'video' in mime:
-                print(f"  ⏭️  Skipping video: {filename}")
+            ext = MIME_EXT_MAP.get(mime)
+            if ext is None:
                 return None
-            else:
+            if mime.startswith('video/'):
+                print(f"  ⏭️  Skipping video: {filename}")
                 return None
+            filename += ext
+            kind = 'image'
         else:
             return None
         
-        filepath = os.path.join(temp_dir, filename)
-        
-        # Download with 30-second timeout
+        # Already on the CDN from a previous run - reuse the URL and skip
+        # both the Telegram download and the ImageKit upload
+        cached = existing_media.get(filename)
+        if cached:
+            return {'url': cached['url'], 'fileId': cached['fileId'], 'kind': kind}
+
+        # Download straight into memory with 30-second timeout - no temp file,
+        # so no blocking disk read/remove stalling the event loop
         print(f"  📥 Downloading: {filename}")
         try:
-            await asyncio.wait_for(
-                client.download_media(message, filepath),
+            data = await _retry(lambda: asyncio.wait_for(
+                client.download_media(message, bytes),
                 timeout=30
-            )
-            
-            # Upload to ImageKit
-            result = upload_to_imagekit(filepath, filename)
-            
-            # Delete temp file
-            try:
-                os.remove(filepath)
-            except:
-                pass
-            
+            ))
+            if not data:
+                return None
+
+            # Push to the media store
+            result = await store.put(data, filename)
+            if result:
+                result['kind'] = kind
+
             return result
-                
+
         except asyncio.TimeoutError:
             print(f"  ⏱️  Timeout downloading {filename}, skipping")
             return None
@@ -141,29 +431,45 @@ async def download_media(client, message, channel_name):
         print(f"  ❌ Error in download_media: {e}")
         return None
 
-async def fetch_channel_posts(client, channel_name, existing_ids, category):
+async def fetch_channel_posts(client, channel_name, existing_ids, category, ids_lock,
+                              store, cutoff_date, last_seen, entity=None, existing_media=None):
     """Fetch posts from a single channel with enhanced filtering"""
     try:
         print(f"\n📱 Fetching from @{channel_name}...")
-        
+
         # Verify channel exists and is accessible
         try:
-            channel = await client.get_entity(channel_name)
-            if not channel.broadcast:
+            channel = entity
+            if channel is None:
+                channel = await _retry(lambda: client.get_entity(channel_name))
+            # A cached InputPeerChannel carries no flags; the broadcast check
+            # already ran when the channel was first resolved
+            if not getattr(channel, 'broadcast', True):
                 print(f"  ⚠️  {channel_name} is not a broadcast channel, skipping")
                 return []
         except Exception as e:
             print(f"  ❌ Cannot access @{channel_name}: {e}")
             return []
         
-        # Calculate cutoff date (timezone-aware)
-        from datetime import timezone
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=MAX_DAYS_OLD)
-        
-        # Fetch messages
-        messages = await client.get_messages(channel, limit=POSTS_PER_CHANNEL * 3)
+        # Fetch messages - min_id makes the fetch incremental, so Telegram
+        # only sends messages newer than the previous run's high-water mark
+        min_id = last_seen.get(channel_name, 0)
+        try:
+            messages = await _retry(lambda: client.get_messages(
+                channel, limit=POSTS_PER_CHANNEL * 3, min_id=min_id))
+        except ChannelInvalidError:
+            # Stale cache entry (e.g. access_hash rotated) - re-resolve once
+            print(f"  ♻️  Cached peer for @{channel_name} is stale, re-resolving")
+            channel = await _retry(lambda: client.get_entity(channel_name))
+            update_entity_cache(channel_name, channel)
+            messages = await _retry(lambda: client.get_messages(
+                channel, limit=POSTS_PER_CHANNEL * 3, min_id=min_id))
+
+        if messages:
+            last_seen[channel_name] = max(min_id, max(m.id for m in messages))
         
         posts = []
+        media_tasks = []  # (post, msg) pairs whose media still needs fetching
         standalone_count = 0
         stats = {
             'replies': 0,
@@ -185,11 +491,11 @@ async def fetch_channel_posts(client, channel_name, existing_ids, category):
                 stats['forwards'] += 1
                 continue
             
-            # FILTER 3: Skip duplicates
-            post_id = f"{channel_name}_{msg.id}"
-            if post_id in existing_ids:
-                stats['duplicates'] += 1
-                continue
+            # FILTER 3: Skip duplicates (lock: existing_ids is shared across channel tasks)
+            async with ids_lock:
+                if existing_ids.seen(channel_name, msg.id):
+                    stats['duplicates'] += 1
+                    continue
             
             # FILTER 4: Skip old posts
             if msg.date < cutoff_date:
@@ -207,33 +513,50 @@ async def fetch_channel_posts(client, channel_name, existing_ids, category):
                     stats['too_short'] += 1
                     continue
             
-            # Download media if present and upload to ImageKit
-            media_result = None
-            if msg.media:
-                media_result = await download_media(client, msg, channel_name)
-            
             post = {
-                'id': post_id,
+                'id': f"{channel_name}_{msg.id}",  # Composite form kept for the archive
                 'messageId': msg.id,
                 'channel': channel_name,
                 'category': category,
                 'text': msg.message or 'No text',
                 'date': msg.date.isoformat(),
-                'image': media_result['url'] if media_result else None,
-                'imageFileId': media_result['fileId'] if media_result else None,  # For cleanup
+                'image': None,  # Filled in by the media pipeline below
+                'imageFileId': None,  # For cleanup
                 'imageData': None,  # No longer storing base64
                 'video': None,
                 'hasMedia': msg.media is not None,
                 'views': msg.views or 0,
             }
             posts.append(post)
-            existing_ids.add(post_id)  # Add to set to prevent duplicates
+            async with ids_lock:
+                existing_ids.add(channel_name, msg.id)  # Mark seen to prevent duplicates
             standalone_count += 1
-            
+
+            # Only a definitively accepted post gets its media queued - no
+            # download ever starts for a post we won't keep
+            if msg.media:
+                media_tasks.append((post, msg))
+
             # Stop when we have enough standalone posts
             if standalone_count >= POSTS_PER_CHANNEL:
                 break
-        
+
+        # Download + upload all media for this channel concurrently, so one
+        # message's ImageKit upload overlaps the next message's download
+        if media_tasks:
+            async def fill_media(post, msg):
+                media_result = await download_media(client, msg, channel_name,
+                                                    store, existing_media or {})
+                if not media_result:
+                    return
+                if media_result['kind'] == 'image':
+                    post['image'] = media_result['url']
+                    post['imageFileId'] = media_result['fileId']
+                else:
+                    post['video'] = media_result['url']
+
+            await asyncio.gather(*(fill_media(p, m) for p, m in media_tasks))
+
         # Print stats
         print(f"  ✅ Fetched {len(posts)} posts")
         if stats['replies'] > 0:
@@ -257,22 +580,32 @@ async def fetch_channel_posts(client, channel_name, existing_ids, category):
 
 async def main():
     """Main function to fetch all channels"""
-    print("🚀 Starting Telegram Channel Fetcher (ImageKit CDN)")
+    store = LocalStore() if STORE_BACKEND == 'local' else ImageKitStore()
+
+    print("🚀 Starting Telegram Channel Fetcher")
     print("=" * 60)
     print(f"📊 Trading Channels: {', '.join(TRADING_CHANNELS) if TRADING_CHANNELS else 'None'}")
     print(f"🎁 Airdrop Channels: {', '.join(AIRDROP_CHANNELS) if AIRDROP_CHANNELS else 'None'}")
     print(f"🔍 Filters: Replies, Forwards, Duplicates, Old Posts ({MAX_DAYS_OLD}d), Short Text")
-    print(f"📤 Image Upload: ImageKit CDN (20GB free)")
+    print(f"📤 Media Store: {type(store).__name__} ({STORE_BACKEND})")
     print("=" * 60)
     
     # Load existing posts to prevent duplicates
-    existing_ids = set()
+    existing_ids = load_dedup_index()
     if os.path.exists('telegram_posts.json'):
         try:
-            with open('telegram_posts.json', 'r', encoding='utf-8') as f:
-                existing_data = json.load(f)
-                existing_ids = {p['id'] for p in existing_data.get('results', [])}
-            print(f"📋 Loaded {len(existing_ids)} existing post IDs")
+            if ijson is not None:
+                # Stream only the id fields; one object in memory at a time
+                with open('telegram_posts.json', 'rb') as f:
+                    for pid in ijson.items(f, 'results.item.id'):
+                        existing_ids.add_post_id(pid)
+            else:
+                with open('telegram_posts.json', 'rb') as f:
+                    raw = f.read()
+                existing_data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+                for p in existing_data.get('results', []):
+                    existing_ids.add_post_id(p['id'])
+            print(f"📋 Dedup index covers {len(existing_ids)} post IDs")
         except Exception as e:
             print(f"⚠️  Could not load existing posts: {e}")
     
@@ -294,7 +627,14 @@ async def main():
         return
     
     client = TelegramClient(session, API_ID, API_HASH)
-    
+
+    # Pooled connections: ImageKit calls reuse warm TLS sessions instead of
+    # paying a handshake per upload/delete
+    global http_session
+    http_session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=20, limit_per_host=10, keepalive_timeout=60)
+    )
+
     try:
         await client.connect()
         
@@ -303,36 +643,83 @@ async def main():
             return
         
         print("✅ Connected to Telegram\n")
-        
+
+        existing_media = await store.existing()
+        if existing_media:
+            print(f"🖼️  Media store already holds {len(existing_media)} files")
+
         all_posts = []
-        
-        # Fetch trading channels
-        if TRADING_CHANNELS:
-            print("📊 Fetching Trading Channels...")
-            for channel in TRADING_CHANNELS:
-                posts = await fetch_channel_posts(client, channel, existing_ids, 'trading')
-                all_posts.extend(posts)
-                await asyncio.sleep(1)
-        
-        # Fetch airdrop channels
-        if AIRDROP_CHANNELS:
-            print("\n🎁 Fetching Airdrop Channels...")
-            for channel in AIRDROP_CHANNELS:
-                posts = await fetch_channel_posts(client, channel, existing_ids, 'airdrop')
-                all_posts.extend(posts)
-                await asyncio.sleep(1)
-        
+        channels = [(ch, 'trading') for ch in TRADING_CHANNELS] + \
+                   [(ch, 'airdrop') for ch in AIRDROP_CHANNELS]
+
+        # Fetch all channels concurrently - the run is network-bound, so
+        # wall time is dominated by the slowest channel instead of the sum.
+        # The semaphore caps in-flight channels; Telethon handles flood waits.
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHANNELS)
+        ids_lock = asyncio.Lock()
+
+        # One cutoff for the whole run, so the age window can't drift
+        # between channels on a long run
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=MAX_DAYS_OLD)
+        last_seen = load_last_seen()
+
+        # Rebuild peers from the on-disk cache where possible; only cache
+        # misses pay the resolve round-trip, and those go out as one batched
+        # get_entity call (Telethon accepts a list).
+        entity_cache = load_entity_cache()
+        channel_names = [ch for ch, _ in channels]
+        entities = {}
+        unresolved = []
+        for ch in channel_names:
+            cached = entity_cache.get(ch)
+            if cached:
+                entities[ch] = InputPeerChannel(cached['id'], cached['access_hash'])
+            else:
+                unresolved.append(ch)
+        if entities:
+            print(f"📇 Reused {len(entities)} cached channel peers")
+        if unresolved:
+            try:
+                resolved = await _retry(lambda: client.get_entity(unresolved))
+                for ch, ent in zip(unresolved, resolved):
+                    entities[ch] = ent
+                    entity_cache[ch] = {'id': ent.id, 'access_hash': ent.access_hash}
+                save_entity_cache(entity_cache)
+            except Exception as e:
+                print(f"⚠️  Batch entity resolution failed, resolving per channel: {e}")
+
+        async def fetch_bounded(channel, category):
+            async with semaphore:
+                return await fetch_channel_posts(client, channel, existing_ids, category,
+                                                 ids_lock, store, cutoff_date, last_seen,
+                                                 entity=entities.get(channel),
+                                                 existing_media=existing_media)
+
+        print(f"📡 Fetching {len(channels)} channels ({MAX_CONCURRENT_CHANNELS} at a time)...")
+        results = await asyncio.gather(
+            *(fetch_bounded(ch, cat) for ch, cat in channels),
+            return_exceptions=True
+        )
+
+        for (channel, _), result in zip(channels, results):
+            if isinstance(result, Exception):
+                print(f"  ❌ Error fetching from @{channel}: {result}")
+            else:
+                all_posts.extend(result)
+
         # Sort by date (newest first)
         all_posts.sort(key=lambda x: x['date'], reverse=True)
         
         # Limit to 80 posts per category (160 total) - frontend will filter to 40 with images
-        trading_posts = [p for p in all_posts if p.get('category') == 'trading'][:80]
-        airdrop_posts = [p for p in all_posts if p.get('category') == 'airdrop'][:80]
+        buckets = defaultdict(list)
+        for p in all_posts:
+            buckets[p['category']].append(p)
+        trading_posts = buckets['trading'][:80]
+        airdrop_posts = buckets['airdrop'][:80]
         all_posts = trading_posts + airdrop_posts
         
-        # Save to JSON
-        output = {
-            'results': all_posts,
+        # Save to JSON (streamed - posts are written as they're serialized)
+        meta = {
             'fetchedAt': datetime.now().isoformat(),
             'totalPosts': len(all_posts),
             'tradingChannels': TRADING_CHANNELS,
@@ -345,19 +732,20 @@ async def main():
                 'minTextLength': MIN_TEXT_LENGTH
             }
         }
-        
-        with open('telegram_posts.json', 'w', encoding='utf-8') as f:
-            json.dump(output, f, indent=2, ensure_ascii=False)
-        
+        write_posts_json('telegram_posts.json', all_posts, meta)
+
+        save_dedup_index(existing_ids)
+        save_last_seen(last_seen)
+
         print("\n" + "=" * 60)
         print(f"✅ Successfully fetched {len(all_posts)} posts")
-        print(f"   📊 Trading: {len([p for p in all_posts if p.get('category') == 'trading'])} posts")
-        print(f"   🎁 Airdrop: {len([p for p in all_posts if p.get('category') == 'airdrop'])} posts")
+        print(f"   📊 Trading: {len(trading_posts)} posts")
+        print(f"   🎁 Airdrop: {len(airdrop_posts)} posts")
         print(f"📝 Saved to telegram_posts.json")
         print("=" * 60)
         
-        # Cleanup old images from ImageKit (older than 30 days)
-        await cleanup_old_images(all_posts)
+        # Cleanup old media (ImageKit: files older than 30 days)
+        await store.cleanup(all_posts)
     
     except Exception as e:
         print(f"\n❌ Error: {e}")
@@ -365,51 +753,47 @@ async def main():
         traceback.print_exc()
     
     finally:
+        await http_session.close()
         await client.disconnect()
 
-async def cleanup_old_images(current_posts):
-    """Delete images from ImageKit that are older than 30 days"""
+async def cleanup_old_images(current_posts, files):
+    """Delete images from ImageKit that are older than 30 days.
+
+    `files` is the listing fetched once at startup; anything uploaded during
+    this run is far younger than the 30-day threshold, so the stale list is
+    safe to reuse here.
+    """
     try:
         print("\n🧹 Cleaning up old images from ImageKit...")
-        
+
         # Get all file IDs from current posts
         current_file_ids = set()
         for post in current_posts:
             if post.get('imageFileId'):
                 current_file_ids.add(post['imageFileId'])
-        
-        # List all files in ImageKit /telegram folder
-        response = requests.get(
-            'https://api.imagekit.io/v1/files',
-            params={'path': '/telegram', 'limit': 1000},
-            auth=(IMAGEKIT_PRIVATE_KEY, ''),
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            files = response.json()
-            deleted_count = 0
-            
-            for file in files:
-                file_id = file['fileId']
-                created_at = datetime.fromisoformat(file['createdAt'].replace('Z', '+00:00'))
-                age_days = (datetime.now(created_at.tzinfo) - created_at).days
-                
-                # Delete if older than 30 days AND not in current posts
-                if age_days > 30 and file_id not in current_file_ids:
-                    delete_response = requests.delete(
-                        f'https://api.imagekit.io/v1/files/{file_id}',
-                        auth=(IMAGEKIT_PRIVATE_KEY, ''),
-                        timeout=10
-                    )
-                    
-                    if delete_response.status_code == 204:
-                        deleted_count += 1
-                        print(f"  🗑️  Deleted: {file['name']} (age: {age_days} days)")
-            
-            print(f"✅ Cleanup complete: Deleted {deleted_count} old images")
-        else:
-            print(f"⚠️  Could not list ImageKit files: {response.status_code}")
+
+        async def delete_file(file):
+            file_id = file['fileId']
+            created_at = datetime.fromisoformat(file['createdAt'].replace('Z', '+00:00'))
+            age_days = (datetime.now(created_at.tzinfo) - created_at).days
+
+            # Delete if older than 30 days AND not in current posts
+            if age_days <= 30 or file_id in current_file_ids:
+                return 0
+
+            async with http_session.delete(
+                f'https://api.imagekit.io/v1/files/{file_id}',
+                auth=aiohttp.BasicAuth(IMAGEKIT_PRIVATE_KEY, ''),
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as delete_response:
+                if delete_response.status == 204:
+                    print(f"  🗑️  Deleted: {file['name']} (age: {age_days} days)")
+                    return 1
+                return 0
+
+        # Deletes are independent - issue them concurrently over the pool
+        deleted = await asyncio.gather(*(delete_file(f) for f in files))
+        print(f"✅ Cleanup complete: Deleted {sum(deleted)} old images")
     
     except Exception as e:
         print(f"⚠️  Cleanup failed: {e}")